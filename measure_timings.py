@@ -22,6 +22,7 @@ import os
 import sys
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional
 import requests
@@ -131,26 +132,40 @@ class TimingProfiler:
         logger.info("="*80)
 
 
-def create_http_session() -> requests.Session:
-    """Create HTTP session with retry logic"""
+def create_http_session(retry: bool = True) -> requests.Session:
+    """Create HTTP session, with retry logic unless retry is False"""
     session = requests.Session()
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    if retry:
+        retry_strategy = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=[429, 500, 502, 503, 504],
+        )
+        adapter = HTTPAdapter(max_retries=retry_strategy)
+    else:
+        adapter = HTTPAdapter(max_retries=0)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
 
 
-def get_study_info(orthanc_url: str, study_id: str) -> Dict:
+# Shared by the requests below so they reuse pooled keep-alive connections
+# instead of opening a new one per call. Setup and cleanup retry on failure;
+# timed requests (the send and the result polls) never do, so a retried
+# attempt and its backoff can't end up inside a measured duration.
+http_session = create_http_session()
+timed_session = create_http_session(retry=False)
+
+
+def get_study_info(
+    orthanc_url: str, study_id: str, session: requests.Session = http_session
+) -> Dict:
     """Get study information from Orthanc
 
     Args:
         orthanc_url: Base URL of Orthanc instance
         study_id: Either Orthanc internal ID or DICOM StudyInstanceUID
+        session: Session to send the requests through
 
     Returns:
         Study information dictionary
@@ -159,7 +174,7 @@ def get_study_info(orthanc_url: str, study_id: str) -> Dict:
     if '.' in study_id:
         logger.info(f"Study ID looks like DICOM UID, looking up Orthanc ID...")
         try:
-            lookup_response = requests.post(
+            lookup_response = session.post(
                 f"{orthanc_url}/tools/lookup",
                 data=study_id,
                 headers={"Content-Type": "text/plain"}
@@ -180,22 +195,25 @@ def get_study_info(orthanc_url: str, study_id: str) -> Dict:
         except requests.exceptions.HTTPException as e:
             raise ValueError(f"Failed to lookup StudyInstanceUID: {e}")
 
-    response = requests.get(f"{orthanc_url}/studies/{study_id}")
+    response = session.get(f"{orthanc_url}/studies/{study_id}")
     response.raise_for_status()
     return response.json()
 
 
 def get_series_info(orthanc_url: str, study_id: str) -> List[Dict]:
     """Get all series in a study"""
-    study_info = get_study_info(orthanc_url, study_id)
+    # Only a StudyInstanceUID needs resolving to the Orthanc ID first
+    if '.' in study_id:
+        study_id = get_study_info(orthanc_url, study_id)['ID']
+
+    # One expanded listing carries every series' MainDicomTags and Instances
+    response = http_session.get(f"{orthanc_url}/studies/{study_id}/series?expand")
+    response.raise_for_status()
     series_list = []
 
-    for series_id in study_info.get('Series', []):
-        series_response = requests.get(f"{orthanc_url}/series/{series_id}")
-        series_response.raise_for_status()
-        series_data = series_response.json()
+    for series_data in response.json():
         series_list.append({
-            'id': series_id,
+            'id': series_data['ID'],
             'uid': series_data['MainDicomTags']['SeriesInstanceUID'],
             'description': series_data['MainDicomTags'].get('SeriesDescription', 'N/A'),
             'modality': series_data['MainDicomTags'].get('Modality', 'N/A'),
@@ -222,7 +240,7 @@ def delete_study_from_router(
     try:
         # Look up the study in the router
         logger.info(f"Looking up study in router: {study_instance_uid}")
-        lookup_response = requests.post(
+        lookup_response = http_session.post(
             f"{orthanc_router_url}/tools/lookup",
             data=study_instance_uid,
             headers={"Content-Type": "text/plain"}
@@ -242,7 +260,7 @@ def delete_study_from_router(
 
         # Delete the study
         delete_start = time.time()
-        delete_response = requests.delete(f"{orthanc_router_url}/studies/{orthanc_study_id}")
+        delete_response = http_session.delete(f"{orthanc_router_url}/studies/{orthanc_study_id}")
         delete_response.raise_for_status()
         delete_duration = (time.time() - delete_start) * 1000
 
@@ -273,8 +291,6 @@ def send_to_ai_and_profile(
 
     Returns: Response from send-to-ai endpoint
     """
-    session = create_http_session()
-
     # Prepare request
     payload = {
         "study_id": study_id,
@@ -291,7 +307,7 @@ def send_to_ai_and_profile(
 
     try:
         # Use the same endpoint as frontend
-        response = session.post(
+        response = timed_session.post(
             f"{orthanc_viewer_url}/send-to-ai",
             json=payload,
             timeout=300  # 5 minutes timeout
@@ -344,7 +360,7 @@ def wait_for_ai_results(
         poll_start = time.time()
 
         try:
-            study_info = get_study_info(orthanc_viewer_url, study_id)
+            study_info = get_study_info(orthanc_viewer_url, study_id, timed_session)
             current_series_count = len(study_info.get('Series', []))
 
             poll_duration = (time.time() - poll_start) * 1000
@@ -388,6 +404,44 @@ def wait_for_ai_results(
     return False
 
 
+def read_container_logs(container: str) -> Optional[str]:
+    """
+    Read the last 10 minutes of a Docker container's logs
+
+    Returns: Combined stdout/stderr, or None if the logs could not be read.
+    Raises FileNotFoundError when the docker command is not available.
+    """
+    # Get logs from docker container with timestamps (use sudo if needed)
+    import subprocess
+
+    try:
+        # Check if we need sudo
+        # Use --timestamps to get timestamps for filtering
+        docker_cmd = ['docker', 'logs', '--timestamps', '--since', '10m', container]
+        if os.geteuid() != 0:  # Not running as root
+            docker_cmd = ['sudo'] + docker_cmd
+
+        result = subprocess.run(
+            docker_cmd,
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+
+        if result.returncode == 0:
+            # Docker logs can be in either stdout or stderr, combine both
+            return result.stdout + result.stderr
+        logger.warning(f"Failed to get logs from {container}: {result.stderr}")
+
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Timeout getting logs from {container}")
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        logger.warning(f"Error getting logs from {container}: {e}")
+    return None
+
+
 def fetch_component_logs(profiler: TimingProfiler, containers: List[str]):
     """
     Fetch and parse timing logs from Docker containers
@@ -396,39 +450,20 @@ def fetch_component_logs(profiler: TimingProfiler, containers: List[str]):
     """
     logger.info("\nFetching component logs for timing analysis...")
 
-    for container in containers:
-        try:
-            # Get logs from docker container with timestamps (use sudo if needed)
-            import subprocess
-            import os
-
-            # Check if we need sudo
-            # Use --timestamps to get timestamps for filtering
-            docker_cmd = ['docker', 'logs', '--timestamps', '--since', '10m', container]
-            if os.geteuid() != 0:  # Not running as root
-                docker_cmd = ['sudo'] + docker_cmd
-
-            result = subprocess.run(
-                docker_cmd,
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-
-            if result.returncode == 0:
-                # Docker logs can be in either stdout or stderr, combine both
-                logs = result.stdout + result.stderr
-                parse_timing_logs(profiler, container, logs)
-            else:
-                logger.warning(f"Failed to get logs from {container}: {result.stderr}")
-
-        except subprocess.TimeoutExpired:
-            logger.warning(f"Timeout getting logs from {container}")
-        except FileNotFoundError:
-            logger.warning("Docker command not found. Skipping log extraction.")
-            break
-        except Exception as e:
-            logger.warning(f"Error getting logs from {container}: {e}")
+    # The docker calls are independent and each may wait up to its timeout, so
+    # read the containers concurrently; parsing stays in container order. The
+    # first one is read alone so a sudo password prompt appears only once.
+    try:
+        all_logs = [read_container_logs(containers[0])] if containers else []
+        with ThreadPoolExecutor(max_workers=max(len(containers) - 1, 1)) as executor:
+            all_logs.extend(executor.map(read_container_logs, containers[1:]))
+    except FileNotFoundError:
+        logger.warning("Docker command not found. Skipping log extraction.")
+        return
+
+    for container, logs in zip(containers, all_logs):
+        if logs is not None:
+            parse_timing_logs(profiler, container, logs)
 
 
 def parse_timing_logs(profiler: TimingProfiler, container: str, logs: str):
@@ -23,6 +23,14 @@ AI_TEXT = os.environ.get("AI_TEXT", "PROCESSED BY AI")
 AI_COLOR = os.environ.get("AI_COLOR", "red")
 AI_NAME = os.environ.get("AI_NAME", "Breast Cancer Classification Model")
 
+# Shared HTTP session so subscriber notifications (several per workitem), model
+# calls and result uploads reuse keep-alive connections
+http_session = requests.Session()
+http_session.mount(
+    "http://",
+    requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0),
+)
+
 
 def notify_subscriber(workitem, subscriber_url):
     """
@@ -33,7 +41,7 @@ def notify_subscriber(workitem, subscriber_url):
         subscriber_url: Subscriber's callback URL
     """
     try:
-        response = requests.post(
+        response = http_session.post(
             f"{subscriber_url}/ups-rs/workitems/{workitem.workitem_uid}",
             data=workitem.to_json(),
             headers={"Content-Type": "application/dicom+json"},
@@ -145,7 +153,7 @@ def process_workitem(workitem):
                 print("No structured input mapping in workitem, using flat WADO-RS URLs")
 
             step_start = time.time()
-            model_response = requests.post(
+            model_response = http_session.post(
                 f"{MODEL_BACKEND_URL}/analyze/mri",
                 json=model_request_body,
                 timeout=1000,
@@ -297,7 +305,7 @@ def process_workitem(workitem):
             upload_start = time.time()
             for dicom_bytes, desc in dicom_objects_to_upload:
                 upload_item_start = time.time()
-                response = requests.post(
+                response = http_session.post(
                     "http://orthanc-viewer:8042/instances",
                     data=dicom_bytes,
                     headers={"Content-Type": "application/dicom"},
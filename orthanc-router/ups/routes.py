@@ -14,6 +14,11 @@ from ups.processor import process_workitem
 
 MANIFEST_PATH = os.environ.get("AI_MANIFEST_PATH", "/etc/orthanc/manifest.json")
 
+# At most this many workitems are processed at once; a burst of requests queues
+# on the semaphore instead of hitting the model backend all at once
+UPS_WORKER_THREADS = int(os.environ.get("UPS_WORKER_THREADS", "4"))
+workitem_slots = threading.BoundedSemaphore(UPS_WORKER_THREADS)
+
 
 def CreateWorkitem(output, uri, **request):
     """
@@ -88,7 +93,8 @@ def CreateWorkitem(output, uri, **request):
         # (similar to OnStableStudy pattern - immediate execution, not polling)
         def process_in_background():
             try:
-                process_workitem(workitem)
+                with workitem_slots:
+                    process_workitem(workitem)
             except Exception as e:
                 print(f"Error processing workitem in background: {str(e)}")
                 import traceback
@@ -99,7 +105,7 @@ def CreateWorkitem(output, uri, **request):
 
         # Return created workitem as DICOM JSON
         output.AnswerBuffer(
-            json.dumps(workitem.data),
+            workitem.to_json(),
             "application/dicom+json"
         )
 
@@ -145,7 +151,7 @@ def GetWorkitem(output, uri, **request):
         print(f"GetWorkitem: Successfully retrieved workitem {workitem_uid}")
         # Return workitem as DICOM JSON
         output.AnswerBuffer(
-            json.dumps(workitem.data),
+            workitem.to_json(),
             "application/dicom+json"
         )
 
@@ -203,7 +209,7 @@ def UpdateWorkitemState(output, uri, **request):
 
         # Return updated workitem
         output.AnswerBuffer(
-            json.dumps(workitem.data),
+            workitem.to_json(),
             "application/dicom+json"
         )
 
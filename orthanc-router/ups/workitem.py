@@ -7,12 +7,25 @@ import json
 from datetime import datetime
 from pydicom.uid import generate_uid
 
+# orjson serializes the nested DICOM JSON several times faster; fall back to stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Shared read-only defaults for missing DICOM JSON elements in the getters below
+_EMPTY_ELEMENT = {}
+_NO_ITEMS = ()
+_NO_VALUE = (None,)
+
 
 class UPSWorkitem:
     """
     UPS workitem using DICOM JSON format (application/dicom+json)
     """
 
+    __slots__ = ("workitem_uid", "data")
+
     def __init__(self, study_uid, series_uids, wado_rs_retrieval, priority="MEDIUM",
                  workitem_uid=None, input_mapping=None, input_configuration_id=None):
         """
@@ -36,9 +49,8 @@ class UPSWorkitem:
     def _create_dicom_json(self, study_uid, series_uids, wado_rs_retrieval, priority,
                            input_mapping=None, input_configuration_id=None):
         """Create DICOM JSON structure per DICOMweb standard"""
-        now = datetime.now()
-        date_str = now.strftime("%Y%m%d")
-        time_str = now.strftime("%H%M%S")
+        # Only the combined DT value is used, so format it in one pass
+        datetime_str = datetime.now().strftime("%Y%m%d%H%M%S")
 
         dicom_json = {
             "00080016": {"vr": "UI", "Value": ["1.2.840.10008.5.1.4.34.6.1"]},  # SOPClassUID: UPS Push
@@ -48,7 +60,7 @@ class UPSWorkitem:
             "00741200": {"vr": "CS", "Value": [priority]},  # ScheduledProcedureStepPriority
             "00741202": {"vr": "LO", "Value": ["AI-INFERENCE"]},  # WorklistLabel
             "00741204": {"vr": "LO", "Value": ["AI Model Inference"]},  # ProcedureStepLabel
-            "00404005": {"vr": "DT", "Value": [date_str + time_str]},  # ScheduledProcedureStepStartDateTime
+            "00404005": {"vr": "DT", "Value": [datetime_str]},  # ScheduledProcedureStepStartDateTime
             "00404041": {"vr": "CS", "Value": ["READY"]},  # InputReadinessState
 
             # Input Information Sequence with WADO-RS retrieval
@@ -73,14 +85,21 @@ class UPSWorkitem:
     def _build_input_sequence(self, wado_rs_retrieval):
         """Build Input Information Sequence with WADO-RS URLs"""
         input_items = []
+        # Retrieve Location UID identifies the WADO-RS server, not the series, so
+        # items served by the same base endpoint share one UID
+        location_uids = {}
         for item in wado_rs_retrieval:
+            location = item["retrieval_url"].split("/studies/", 1)[0]
+            location_uid = location_uids.get(location)
+            if location_uid is None:
+                location_uid = location_uids[location] = generate_uid()
             input_items.append({
                 "0040E020": {"vr": "CS", "Value": ["DICOM"]},  # TypeOfInstances
                 "0020000D": {"vr": "UI", "Value": [item["study_uid"]]},
                 "0020000E": {"vr": "UI", "Value": [item["series_uid"]]},
                 "0040E025": {"vr": "SQ", "Value": [{  # WADO-RS Retrieval Sequence
                     "00081190": {"vr": "UR", "Value": [item["retrieval_url"]]},
-                    "0040E011": {"vr": "UI", "Value": [generate_uid()]}  # Retrieve Location UID
+                    "0040E011": {"vr": "UI", "Value": [location_uid]}  # Retrieve Location UID
                 }]}
             })
         return input_items
@@ -172,9 +191,14 @@ class UPSWorkitem:
             progress_description: Optional textual description of progress
             cancellation_reason: Optional reason for cancellation (used when state is CANCELED)
         """
-        # Always update state if provided
+        # Always update state if provided; the element exists from creation, so
+        # overwrite its value in place rather than rebuilding it
         if new_state:
-            self.data["00741000"] = {"vr": "CS", "Value": [new_state]}
+            state_element = self.data.get("00741000")
+            if state_element and state_element.get("Value"):
+                state_element["Value"][0] = new_state
+            else:
+                self.data["00741000"] = {"vr": "CS", "Value": [new_state]}
 
         # Handle progress information (for IN_PROGRESS state OR when updating existing IN_PROGRESS)
         current_state = self.data["00741000"]["Value"][0]
@@ -209,6 +233,8 @@ class UPSWorkitem:
 
     def to_json(self):
         """Serialize to JSON string for K-V storage"""
+        if orjson is not None:
+            return orjson.dumps(self.data).decode("utf-8")
         return json.dumps(self.data)
 
     @classmethod
@@ -225,7 +251,7 @@ class UPSWorkitem:
         """
         instance = cls.__new__(cls)
         instance.workitem_uid = workitem_uid
-        instance.data = json.loads(json_str)
+        instance.data = orjson.loads(json_str) if orjson is not None else json.loads(json_str)
         return instance
 
     def get_state(self):
@@ -240,16 +266,16 @@ class UPSWorkitem:
             List of dicts with retrieval_url, study_uid, series_uid
         """
         urls = []
-        input_seq = self.data.get("00404021", {}).get("Value", [])
-        for item in input_seq:
-            retrieval_seq = item.get("0040E025", {}).get("Value", [])
-            for ret_item in retrieval_seq:
-                url = ret_item.get("00081190", {}).get("Value", [None])[0]
+        for item in self.data.get("00404021", _EMPTY_ELEMENT).get("Value", _NO_ITEMS):
+            study_uid = item.get("0020000D", _EMPTY_ELEMENT).get("Value", _NO_VALUE)[0]
+            series_uid = item.get("0020000E", _EMPTY_ELEMENT).get("Value", _NO_VALUE)[0]
+            for ret_item in item.get("0040E025", _EMPTY_ELEMENT).get("Value", _NO_ITEMS):
+                url = ret_item.get("00081190", _EMPTY_ELEMENT).get("Value", _NO_VALUE)[0]
                 if url:
                     urls.append({
                         "retrieval_url": url,
-                        "study_uid": item.get("0020000D", {}).get("Value", [None])[0],
-                        "series_uid": item.get("0020000E", {}).get("Value", [None])[0]
+                        "study_uid": study_uid,
+                        "series_uid": series_uid
                     })
         return urls
 
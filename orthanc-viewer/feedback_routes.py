@@ -1,5 +1,5 @@
 import json
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 import orthanc
 
@@ -8,35 +8,58 @@ try:
     import feedback_db  # type: ignore
 except Exception as _e:
     raise
+from json_compat import json_dumps  # type: ignore
 
+# Feedback payloads are a handful of short fields; anything larger is rejected
+# before it reaches the JSON parser.
+_MAX_BODY_BYTES = 64 * 1024
 
-def _json(output, obj: Dict[str, Any], status_ok: bool = True):
-    body = json.dumps(obj)
-    if status_ok:
-        output.AnswerBuffer(body, "application/json")
-    else:
-        # For non-200 (e.g., 201/409), SendHttpStatus is the only way to set code.
-        # Content-Type may be text/plain, but body is JSON string.
-        # Callers should still be able to parse.
-        # The caller must set the exact status via output.SendHttpStatus before returning.
-        return body
+_CT_JSON = "application/json"
+_CT_NDJSON = "application/x-ndjson"
+_CT_CSV = "text/csv"
+
+
+def _ok_json(output, obj: Dict[str, Any]):
+    output.AnswerBuffer(json.dumps(obj), _CT_JSON)
 
 
 def _bad_request(output, message: str):
     output.SendHttpStatus(400, message)
 
 
+def _send_error(output, code: int, message: str):
+    # Same bytes as json.dumps({"code": ..., "message": ...}) without the dict
+    body = '{"code": %d, "message": %s}' % (code, json.dumps(message))
+    output.SendHttpStatus(code, body)
+
+
+def _payload_too_large(output, body) -> bool:
+    if len(body) > _MAX_BODY_BYTES:
+        _send_error(output, 413, "Payload too large")
+        return True
+    return False
+
+
+_RESULT_KEY_FIELDS = ("study_uid", "model_name", "model_version", "result_ts")
+
+
+def _missing_fields(p: Dict[str, Any], fields) -> List[str]:
+    # A field sent as null or "" counts as missing, in bodies and query strings
+    return [k for k in fields if p.get(k) in (None, "")]
+
+
+def _truthy(value) -> bool:
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def _error_result(code: int, message: str):
+    return code, {"code": code, "message": message}
+
+
 def _validate_submit_payload(p: Dict[str, Any]) -> str:
-    required = [
-        "study_uid",
-        "model_name",
-        "model_version",
-        "result_ts",
-        "user_id",
-        "verdict_L",
-        "verdict_R",
-    ]
-    missing = [k for k in required if k not in p]
+    missing = _missing_fields(
+        p, _RESULT_KEY_FIELDS + ("user_id", "verdict_L", "verdict_R")
+    )
     if missing:
         return f"Missing fields: {', '.join(missing)}"
     try:
@@ -44,7 +67,7 @@ def _validate_submit_payload(p: Dict[str, Any]) -> str:
         vR = int(p["verdict_R"])
     except Exception:
         return "verdict_L and verdict_R must be integers in (-1,0,1)"
-    if vL not in (-1, 0, 1) or vR not in (-1, 0, 1):
+    if not (-1 <= vL <= 1 and -1 <= vR <= 1):
         return "verdict_L and verdict_R must be in (-1,0,1)"
     # optional edited flag must be boolean if present
     if "edited" in p and not isinstance(p["edited"], (bool, int)):
@@ -52,131 +75,159 @@ def _validate_submit_payload(p: Dict[str, Any]) -> str:
     return ""
 
 
-def FeedbackSubmit(output, uri, **request):
-    if request["method"] != "POST":
-        output.SendMethodNotAllowed("POST")
-        return
+# The _*_op helpers hold the validation and DB call of each operation and are
+# shared by the single endpoints and /feedback/batch. They return
+# (status, body) with errors as {"code": ..., "message": ...}.
+def _submit_op(p: Dict[str, Any], _db):
+    err = _validate_submit_payload(p)
+    if err:
+        return _error_result(400, err)
+    try:
+        return 201, _db.submit_feedback(p)
+    except _db.ConflictError as e:
+        return _error_result(409, str(e))
+
+
+def _register_op(p: Dict[str, Any], _db):
+    missing = _missing_fields(p, _RESULT_KEY_FIELDS)
+    if missing:
+        return _error_result(400, f"Missing fields: {', '.join(missing)}")
+    res = _db.register_result(
+        p["study_uid"],
+        p["model_name"],
+        p["model_version"],
+        p["result_ts"],
+        p.get("meta_json"),
+    )
+    return (201 if res.get("created") else 200), res
+
+
+def _read_op(p: Dict[str, Any], _db):
+    missing = _missing_fields(p, _RESULT_KEY_FIELDS)
+    if missing:
+        return _error_result(400, f"Missing fields: {', '.join(missing)}")
+    return 200, _db.read_feedback(
+        p["study_uid"],
+        p["model_name"],
+        p["model_version"],
+        p["result_ts"],
+        _truthy(p.get("includeUsers", False)),
+        _truthy(p.get("includeHistory", False)),
+    )
+
+
+def _json_body(output, request, _loads):
+    """Parse the body as a JSON object; otherwise answer 400/413 and return None."""
+    body = request.get("body", "{}")
+    if _payload_too_large(output, body):
+        return None
     try:
-        p = json.loads(request.get("body", "{}"))
+        parsed = _loads(body)
     except Exception as e:
         _bad_request(output, f"Invalid JSON body: {str(e)}")
-        return
-    err = _validate_submit_payload(p)
-    if err:
-        _bad_request(output, err)
-        return
+        return None
+    if not isinstance(parsed, dict):
+        _bad_request(output, "JSON body must be an object")
+        return None
+    return parsed
+
+
+def _answer_op(output, op, p: Dict[str, Any], _dumps, _db):
+    """Run one op for a single endpoint and send its result."""
     try:
-        saved = feedback_db.submit_feedback(p)
-        # 201 Created
-        body = json.dumps(saved)
-        output.SendHttpStatus(201, body)
-    except feedback_db.ConflictError as e:
-        output.SendHttpStatus(
-            409,
-            json.dumps({"code": 409, "message": str(e)}),
-        )
+        status, res = op(p, _db)
     except Exception as e:
-        output.SendHttpStatus(500, json.dumps({"code": 500, "message": str(e)}))
+        _send_error(output, 500, str(e))
+        return
+    if status == 400:
+        _bad_request(output, res["message"])
+    elif status >= 400:
+        _send_error(output, status, res["message"])
+    elif status == 200:
+        output.AnswerBuffer(_dumps(res), _CT_JSON)
+    else:
+        output.SendHttpStatus(status, _dumps(res))
+
 
+# Handlers bind json/feedback_db as default args so lookups on the request path
+# are locals rather than module globals.
+def FeedbackSubmit(
+    output, uri, _loads=json.loads, _dumps=json.dumps, _db=feedback_db, **request
+):
+    if request["method"] != "POST":
+        output.SendMethodNotAllowed("POST")
+        return
+    p = _json_body(output, request, _loads)
+    if p is not None:
+        _answer_op(output, _submit_op, p, _dumps, _db)
 
-def FeedbackRead(output, uri, **request):
+
+def FeedbackRead(output, uri, _dumps=json.dumps, _db=feedback_db, **request):
     if request["method"] != "GET":
         output.SendMethodNotAllowed("GET")
         return
-    q = request.get("get", {}) or {}
-    study_uid = q.get("study_uid")
-    model_name = q.get("model_name")
-    model_version = q.get("model_version")
-    result_ts = q.get("result_ts")
-    include_users = str(q.get("includeUsers", "false")).lower() in ("1", "true", "yes")
-    include_history = str(q.get("includeHistory", "false")).lower() in (
-        "1",
-        "true",
-        "yes",
-    )
-    if not all([study_uid, model_name, model_version, result_ts]):
+    g = request.get("get", {}) or {}
+    # Checked here as well so the GET endpoint keeps its query-param wording
+    if _missing_fields(g, _RESULT_KEY_FIELDS):
         _bad_request(
             output,
             "Missing one of required query params: study_uid, model_name, model_version, result_ts",
         )
         return
-    try:
-        data = feedback_db.read_feedback(
-            study_uid,
-            model_name,
-            model_version,
-            result_ts,
-            include_users,
-            include_history,
-        )
-        _json(output, data)
-    except Exception as e:
-        output.SendHttpStatus(500, json.dumps({"code": 500, "message": str(e)}))
+    _answer_op(output, _read_op, g, _dumps, _db)
 
 
-def FeedbackRegisterResult(output, uri, **request):
+def FeedbackRegisterResult(
+    output, uri, _loads=json.loads, _dumps=json.dumps, _db=feedback_db, **request
+):
     if request["method"] != "POST":
         output.SendMethodNotAllowed("POST")
         return
-    try:
-        p = json.loads(request.get("body", "{}"))
-    except Exception as e:
-        _bad_request(output, f"Invalid JSON body: {str(e)}")
-        return
-    required = ["study_uid", "model_name", "model_version", "result_ts"]
-    if not all(k in p for k in required):
-        _bad_request(
-            output, f"Missing fields: {', '.join([k for k in required if k not in p])}"
-        )
-        return
-    try:
-        res = feedback_db.register_result(
-            p["study_uid"],
-            p["model_name"],
-            p["model_version"],
-            p["result_ts"],
-            p.get("meta_json"),
-        )
-        body = json.dumps(res)
-        output.SendHttpStatus(201 if res.get("created") else 200, body)
-    except Exception as e:
-        output.SendHttpStatus(500, json.dumps({"code": 500, "message": str(e)}))
+    p = _json_body(output, request, _loads)
+    if p is not None:
+        _answer_op(output, _register_op, p, _dumps, _db)
 
 
-def FeedbackExportNdjson(output, uri, **request):
+def FeedbackExportNdjson(output, uri, _dumps=json_dumps, _db=feedback_db, **request):
     if request["method"] != "GET":
         output.SendMethodNotAllowed("GET")
         return
-    q = request.get("get", {}) or {}
-    since = q.get("since")
-    until = q.get("until")
-    model_name = q.get("model_name")
-    model_version = q.get("model_version")
-    scope = q.get("scope", "history")
+    g = (request.get("get", {}) or {}).get
+    since, until, model_name, model_version, scope = (
+        g("since"),
+        g("until"),
+        g("model_name"),
+        g("model_version"),
+        g("scope", "history"),
+    )
     try:
-        chunks = []
-        for obj in feedback_db.export_rows_ndjson(
-            since, until, model_name, model_version, scope
-        ):
-            chunks.append(json.dumps(obj))
-        ndjson = "\n".join(chunks)
-        output.AnswerBuffer(ndjson, "application/x-ndjson")
+        # The plugin API can only answer with a complete buffer, so rows are
+        # serialized as they come off the cursor and joined once at the end
+        ndjson = b"\n".join(
+            map(
+                _dumps,
+                _db.export_rows_ndjson(since, until, model_name, model_version, scope),
+            )
+        )
+        output.AnswerBuffer(ndjson, _CT_NDJSON)
     except Exception as e:
-        output.SendHttpStatus(500, json.dumps({"code": 500, "message": str(e)}))
+        _send_error(output, 500, str(e))
 
 
-def FeedbackExportCsv(output, uri, **request):
+def FeedbackExportCsv(output, uri, _db=feedback_db, **request):
     if request["method"] != "GET":
         output.SendMethodNotAllowed("GET")
         return
-    q = request.get("get", {}) or {}
-    since = q.get("since")
-    until = q.get("until")
-    model_name = q.get("model_name")
-    model_version = q.get("model_version")
-    scope = q.get("scope", "history")
+    g = (request.get("get", {}) or {}).get
+    since, until, model_name, model_version, scope = (
+        g("since"),
+        g("until"),
+        g("model_name"),
+        g("model_version"),
+        g("scope", "history"),
+    )
     try:
-        header, rows_iter = feedback_db.export_rows_csv(
+        header, rows_iter = _db.export_rows_csv(
             since, until, model_name, model_version, scope
         )
         lines = [header]
@@ -195,20 +246,61 @@ def FeedbackExportCsv(output, uri, **request):
                 str(r[8]),
             ]
             lines.append(",".join(fields) + "\n")
-        output.AnswerBuffer("".join(lines), "text/csv")
+        output.AnswerBuffer("".join(lines), _CT_CSV)
     except Exception as e:
-        output.SendHttpStatus(500, json.dumps({"code": 500, "message": str(e)}))
+        _send_error(output, 500, str(e))
+
+
+_BATCH_OPS = {
+    "submit": _submit_op,
+    "register_result": _register_op,
+    "read": _read_op,
+}
+
+
+def FeedbackBatch(
+    output, uri, _loads=json.loads, _dumps=json.dumps, _db=feedback_db, **request
+):
+    """
+    Run several submit/register_result/read ops in one round trip.
+
+    Body: {"ops": [{"op": "submit", ...fields}, ...]}. Ops run in order and each
+    gets the status and body its single endpoint would return, so a failing op
+    (e.g. a 409 duplicate submit) does not stop the ones after it.
+    """
+    if request["method"] != "POST":
+        output.SendMethodNotAllowed("POST")
+        return
+    p = _json_body(output, request, _loads)
+    if p is None:
+        return
+    ops = p.get("ops")
+    if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+        _bad_request(output, "ops must be a list of objects")
+        return
+    results = []
+    for op in ops:
+        run = _BATCH_OPS.get(op.get("op"))
+        try:
+            if run is None:
+                status, res = _error_result(400, f"Unknown op: {op.get('op')}")
+            else:
+                status, res = run(op, _db)
+        except Exception as e:
+            status, res = _error_result(500, str(e))
+        results.append({"status": status, "body": res})
+    output.AnswerBuffer(_dumps({"results": results}), _CT_JSON)
 
 
-def FeedbackHealth(output, uri, **request):
+def FeedbackHealth(output, uri, _db=feedback_db, **request):
     if request["method"] != "GET":
         output.SendMethodNotAllowed("GET")
         return
     try:
-        info = feedback_db.health()
-        _json(output, info)
+        info = _db.health()
+        _ok_json(output, info)
     except Exception as e:
-        output.SendHttpStatus(500, json.dumps({"code": 500, "message": str(e)}))
+        _send_error(output, 500, str(e))
 
 
 def register_feedback_endpoints():
@@ -218,3 +310,4 @@ def register_feedback_endpoints():
     orthanc.RegisterRestCallback("/feedback/export.ndjson", FeedbackExportNdjson)
     orthanc.RegisterRestCallback("/feedback/export.csv", FeedbackExportCsv)
     orthanc.RegisterRestCallback("/feedback/health", FeedbackHealth)
+    orthanc.RegisterRestCallback("/feedback/batch", FeedbackBatch)
@@ -0,0 +1,18 @@
+import json
+
+# orjson parses Orthanc's REST responses (series listings can be large) several
+# times faster and serializes straight to bytes, which the plugin API, requests
+# and AnswerBuffer all accept. The stdlib fallback produces the same compact
+# UTF-8 bytes, so output does not depend on which one is installed.
+try:
+    import orjson
+
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode(
+            "utf-8"
+        )
@@ -1,6 +1,8 @@
-import json
 import os
+import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import orthanc
 import requests
@@ -13,6 +15,8 @@ try:
 except Exception:
     pass
 
+from json_compat import json_dumps, json_loads  # type: ignore
+
 # Feedback endpoints
 try:
     import feedback_routes  # type: ignore
@@ -31,65 +35,173 @@ except Exception as e:
     print(f"Warning: Could not initialize UPS storage: {e}")
     ups_storage = None
 
-
-def FilterAIResultSeries(study_id):
+# Shared HTTP session so calls to localhost and the AI routers reuse keep-alive connections
+http_session = requests.Session()
+http_session.mount(
+    "http://",
+    requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=0),
+)
+http_session.headers.update({"Content-Type": "application/json"})
+# Connect timeout for http_session calls (just over the 3 s TCP SYN retransmit)
+HTTP_CONNECT_TIMEOUT = 3.05
+
+# Series descriptions that mark AI-generated results (based on server.py analysis),
+# plus AI_ prefix / _AI suffix conventions, matched in a single regex scan
+AI_MARKER_RE = re.compile(
+    "|".join(
+        re.escape(marker)
+        for marker in (
+            "Automated Diagnostic Findings",  # Exact SR match from server.py
+            "- Heatmap",  # SC pattern match from server.py
+            "AI Analysis Result",  # Generic fallback
+            "AI Generated",  # Generic fallback
+            "Secondary Capture AI",  # Generic fallback
+            "AI Structured Report",  # Generic fallback
+        )
+    )
+    + r"|^AI_|_AI$"
+)
+AI_RESULT_MODALITIES = frozenset(("SC", "SR"))
+
+# Static part of the DICOM modality configuration written by SendToAiDicom;
+# only AET/Host/Port vary per target
+MODALITY_CONFIG_TEMPLATE = {
+    "Manufacturer": "Generic",
+    "AllowEcho": True,
+    "AllowFind": True,
+    "AllowGet": True,
+    "AllowMove": True,
+    "AllowStore": True,
+    "CheckCalledAet": False,
+    "DicomAet": "ORTHANC",  # Your Orthanc's AE Title
+    "DicomCheckCalledAet": False,
+    "DicomPort": 4242,  # Your Orthanc's DICOM port
+    "DicomWeb": {
+        "Enable": False,
+        "Root": "/dicom-web/",
+        "Ssl": False,
+        "Studies": True,
+        "EnableWado": False,
+        "WadoRoot": "/wado",
+        "WadoMetadata": {"Enable": False, "MaxResults": 100},
+    },
+    "Timeout": 60,  # Increase timeout to 60 seconds
+    "ConcurrentOperations": 1,  # Limit to 1 concurrent operation
+    "RetryCount": 3,  # Retry up to 3 times
+    "RetryDelay": 5,  # Wait 5 seconds between retries
+    "TransferSyntaxes": [
+        "1.2.840.10008.1.2.1",  # Explicit VR Little Endian
+        "1.2.840.10008.1.2",  # Implicit VR Little Endian
+        "1.2.840.10008.1.2.2",  # Explicit VR Big Endian
+    ],
+}
+
+# target -> target_url of DICOM modalities configured by SendToAiDicom in this process
+configured_modalities = {}
+
+# target -> (Url, Username, Password) of DICOMweb servers configured by
+# SendToAiDicomWeb in this process
+configured_dicomweb_servers = {}
+
+# Full request/response bodies are only serialized into the log when enabled
+LOG_PAYLOADS = os.environ.get("ORTHANC_ROUTER_LOG_PAYLOADS", "0") not in (
+    "0",
+    "false",
+    "False",
+)
+
+# Serialized once; returned by GetAIManifest whenever the router has no manifest
+NULL_MANIFEST_JSON = json_dumps({"manifest": None})
+
+# (study_id, LastUpdate) -> filtered series records; a study change bumps
+# LastUpdate, so stale entries are never hit and just age out
+filtered_series_cache = {}
+FILTERED_SERIES_CACHE_SIZE = 512
+# Orthanc runs REST callbacks on several threads; guards eviction + insert
+filtered_series_cache_lock = threading.Lock()
+
+# Max concurrent /tools/lookup calls when resolving explicit series UIDs
+SERIES_LOOKUP_WORKERS = 8
+
+
+def GetStudySeries(study_id):
+    """Get all series of a study, expanded with their MainDicomTags and Instances"""
+    return json_loads(orthanc.RestApiGet(f"/studies/{study_id}/series?expand"))
+
+
+def FilterAIResultSeries(study_id, study_series=None):
     """
     Get all non-AI series from a study for AI processing.
     Returns a list of series IDs that should be sent to AI models.
     Filters out any series that appear to be AI-generated results.
     """
+    return [
+        record["id"]
+        for record in FilterAIResultSeriesRecords(study_id, study_series=study_series)
+    ]
+
+
+def FilterAIResultSeriesRecords(study_id, last_update=None, study_series=None):
+    """
+    Same filtering as FilterAIResultSeries, but returns a list of
+    {"id": <Orthanc series ID>, "series_uid": <SeriesInstanceUID>} dicts so callers
+    that need the DICOM UIDs do not have to query each series again.
+    When the study's LastUpdate is passed, results are cached per
+    (study_id, last_update) so repeat dispatches of an unchanged study skip
+    the series listing. A GetStudySeries result already fetched by the caller
+    can be passed as study_series.
+    """
+    cache_key = (study_id, last_update)
+    cached = filtered_series_cache.get(cache_key) if last_update else None
+    if cached is not None:
+        print(f"Study {study_id}: Using cached series filter ({last_update})")
+        return list(cached)
+
     try:
-        # Get all series in the study
-        series_list = json.loads(orthanc.RestApiGet(f"/studies/{study_id}/series"))
+        # Get all series in the study, expanded with their MainDicomTags.
+        # /tools/find cannot express the exclusion here (its wildcards have no
+        # negation), so one expanded listing plus the regex below is the
+        # cheapest option: a single REST call with no per-series lookups.
+        series_list = (
+            study_series if study_series is not None else GetStudySeries(study_id)
+        )
 
         original_series = []
         ai_series_count = 0
+        # Bound once outside the loop; studies can hold hundreds of series
+        search = AI_MARKER_RE.search
+        append = original_series.append
 
         for series in series_list:
             series_id = series["ID"]
+            main_tags = series.get("MainDicomTags", {})
 
-            # Get series tags to check if it's an AI result
-            try:
-                series_tags = json.loads(
-                    orthanc.RestApiGet(f"/series/{series_id}/tags?simplify")
-                )
+            series_description = main_tags.get("SeriesDescription", "").strip()
+            modality = main_tags.get("Modality", "").strip()
 
-                series_description = series_tags.get("SeriesDescription", "").strip()
-                modality = series_tags.get("Modality", "").strip()
-
-                # Check for AI result markers (based on server.py analysis)
-                ai_markers = [
-                    "Automated Diagnostic Findings",  # Exact SR match from server.py
-                    "- Heatmap",  # SC pattern match from server.py
-                    "AI Analysis Result",  # Generic fallback
-                    "AI Generated",  # Generic fallback
-                    "Secondary Capture AI",  # Generic fallback
-                    "AI Structured Report",  # Generic fallback
-                ]
+            is_ai_result = search(series_description) is not None or (
+                modality in AI_RESULT_MODALITIES and "AI" in series_description.upper()
+            )
 
-                is_ai_result = (
-                    any(marker in series_description for marker in ai_markers)
-                    or (modality in ["SC", "SR"] and "AI" in series_description.upper())
-                    or series_description.startswith("AI_")
-                    or series_description.endswith("_AI")
+            if is_ai_result:
+                ai_series_count += 1
+                print(
+                    f"Filtering out AI result series: {series_id} ({series_description}, {modality})"
+                )
+            else:
+                append(
+                    {"id": series_id, "series_uid": main_tags.get("SeriesInstanceUID")}
                 )
-
-                if is_ai_result:
-                    ai_series_count += 1
-                    print(
-                        f"Filtering out AI result series: {series_id} ({series_description}, {modality})"
-                    )
-                else:
-                    original_series.append(series_id)
-
-            except Exception as e:
-                print(f"Warning: Could not check series {series_id}: {str(e)}")
-                # If we can't check, assume it's original data and include it
-                original_series.append(series_id)
 
         print(
             f"Study {study_id}: Found {len(original_series)} original series, {ai_series_count} AI result series"
         )
+        if last_update:
+            with filtered_series_cache_lock:
+                if len(filtered_series_cache) >= FILTERED_SERIES_CACHE_SIZE:
+                    # Evict the oldest entry (dicts keep insertion order)
+                    filtered_series_cache.pop(next(iter(filtered_series_cache)))
+                filtered_series_cache[cache_key] = tuple(original_series)
         return original_series
 
     except Exception as e:
@@ -98,46 +210,108 @@ def FilterAIResultSeries(study_id):
         return []
 
 
-def HasProcessableContent(study_id):
+def LookupSeriesIds(series_uids, study_id=None, study_series=None):
     """
-    Check if study has any non-AI series that can be processed.
-    Returns True if there are original series available for AI processing.
+    Resolve DICOM SeriesInstanceUIDs to Orthanc series IDs.
+    When study_id is given, the study's expanded series listing (study_series, or
+    fetched here) resolves all UIDs in at most one REST call. Any UIDs not found
+    there (or all of them, without study_id) fall back to /tools/lookup; each is
+    an independent call, so they are issued concurrently.
+    Returns a list of (series_uid, series_id) pairs for the UIDs found, in input order.
     """
-    original_series = FilterAIResultSeries(study_id)
-    return len(original_series) > 0
-
+    resolved = {}
+    if study_id:
+        try:
+            if study_series is None:
+                study_series = GetStudySeries(study_id)
+            for series in study_series:
+                uid = series.get("MainDicomTags", {}).get("SeriesInstanceUID")
+                if uid:
+                    resolved[uid] = series["ID"]
+        except Exception as e:
+            print(f"Warning: Could not list series of study {study_id}: {str(e)}")
 
-def GetStudyInstanceUID(study_id):
-    """Get the DICOM StudyInstanceUID from an Orthanc study ID"""
-    try:
-        # Get the study information
-        study_info = json.loads(orthanc.RestApiGet(f"/studies/{study_id}"))
-        # Get the MainDicomTags which contains the StudyInstanceUID
-        main_tags = study_info.get("MainDicomTags", {})
-        study_instance_uid = main_tags.get("StudyInstanceUID")
-        if not study_instance_uid:
-            print(f"Warning: StudyInstanceUID not found for study {study_id}")
+    def lookup(series_uid):
+        try:
+            lookup_result = json_loads(orthanc.RestApiPost("/tools/lookup", series_uid))
+        except Exception as e:
+            print(f"Warning: Could not lookup series UID {series_uid}: {str(e)}")
+            return None
+        series_result = [r for r in lookup_result if r["Type"] == "Series"]
+        if not series_result:
+            print(f"Warning: Series UID {series_uid} not found")
             return None
-        return study_instance_uid
+        print(f"Found series {series_result[0]['ID']} for UID {series_uid}")
+        return series_result[0]["ID"]
+
+    unresolved = [uid for uid in series_uids if uid not in resolved]
+    if unresolved:
+        workers = max(1, min(SERIES_LOOKUP_WORKERS, len(unresolved)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            resolved.update(zip(unresolved, executor.map(lookup, unresolved)))
+    return [
+        (series_uid, resolved[series_uid])
+        for series_uid in series_uids
+        if resolved.get(series_uid)
+    ]
+
+
+def CollectSeriesInstances(study_id, series_ids, study_series=None):
+    """
+    Get the Orthanc instance IDs of the given series, grouped in series order.
+    Uses a single /studies/{id}/series request, whose entries already list their
+    instance IDs, instead of one request per series or a full per-instance listing.
+    A GetStudySeries result already fetched by the caller can be passed as
+    study_series to skip that request too.
+    """
+    by_series = {series_id: [] for series_id in series_ids}
+    try:
+        if study_series is None:
+            study_series = GetStudySeries(study_id)
+        for series in study_series:
+            if series["ID"] in by_series:
+                by_series[series["ID"]] = series["Instances"]
     except Exception as e:
-        print(f"Error getting StudyInstanceUID: {str(e)}")
-        return None
+        print(f"Warning: Could not get instances for study {study_id}: {str(e)}")
 
+    instance_ids = []
+    counts = []
+    for series_id, series_instance_ids in by_series.items():
+        if not series_instance_ids:
+            # Series not found in this study (e.g. explicit series_uids), query it directly
+            try:
+                series_instances = json_loads(
+                    orthanc.RestApiGet(f"/series/{series_id}/instances")
+                )
+                series_instance_ids = [instance["ID"] for instance in series_instances]
+            except Exception as e:
+                print(
+                    f"Warning: Could not get instances for series {series_id}: {str(e)}"
+                )
+        instance_ids.extend(series_instance_ids)
+        counts.append(f"{series_id}: {len(series_instance_ids)}")
+    # One summary line instead of a print per series
+    print(f"Study {study_id}: instances per series: {', '.join(counts)}")
+    return instance_ids
+
+
+def EncodeIdList(ids):
+    """
+    JSON-encode a list of Orthanc resource IDs by joining them directly.
+    Orthanc IDs are dash-separated hex, so no escaping is ever needed.
+    """
+    return '["' + '","'.join(ids) + '"]' if ids else "[]"
 
-def ListModalities():
-    """List all configured DICOM modalities"""
+
+def IsDicomWebServerListed(target):
+    """Check whether the DICOMweb plugin currently has a server named target"""
     try:
-        modalities = json.loads(orthanc.RestApiGet("/modalities"))
-        print("Configured DICOM modalities:")
-        for modality in modalities:
-            modality_info = json.loads(orthanc.RestApiGet(f"/modalities/{modality}"))
-            print(
-                f"  - {modality}: {modality_info.get('Host', 'unknown')}:{modality_info.get('Port', 'unknown')} (AET: {modality_info.get('AET', 'unknown')})"
-            )
-        return modalities
+        return target in json_loads(
+            orthanc.RestApiGetAfterPlugins("/dicom-web/servers")
+        )
     except Exception as e:
-        print(f"Error listing modalities: {str(e)}")
-        return []
+        print(f"Warning: Could not list DICOMweb servers: {str(e)}")
+        return False
 
 
 def SendToAiDicom(output, uri, **request):
@@ -148,7 +322,7 @@ def SendToAiDicom(output, uri, **request):
 
     try:
         # Parse the POST body
-        body = json.loads(request["body"])
+        body = json_loads(request["body"])
         study_id = body.get("study_id")
         target = body.get("target")
         target_url = body.get("target_url")
@@ -158,40 +332,33 @@ def SendToAiDicom(output, uri, **request):
             output.SendHttpStatus(400, "Missing study_id or target in request body")
             return
 
-        # If series_uids not provided, check if study has processable content
-        if not series_uids and not HasProcessableContent(study_id):
-            output.SendHttpStatus(
-                400, "Study contains no processable content (only AI results or empty)"
-            )
-            return
+        # The study's series listing is fetched once for this request and shared
+        # by the AI filter, the series UID lookup and the instance collection
+        try:
+            study_series = GetStudySeries(study_id)
+        except Exception as e:
+            print(f"Warning: Could not list series of study {study_id}: {str(e)}")
+            study_series = None
 
-        # List all configured modalities before proceeding
-        ListModalities()
+        # If series_uids not provided, filter out AI results once up front; an
+        # empty result means the study has no processable content
+        if not series_uids:
+            original_series = FilterAIResultSeries(study_id, study_series)
+            if not original_series:
+                output.SendHttpStatus(
+                    400,
+                    "Study contains no processable content (only AI results or empty)",
+                )
+                return
 
-        # Configure DICOM modality if target_url is provided
-        if target_url:
+        # Configure DICOM modality if target_url is provided and differs from
+        # what this process last configured for the target
+        if target_url and configured_modalities.get(target) == target_url:
+            print(f"DICOM modality {target} already configured for {target_url}")
+        elif target_url:
             try:
                 # Parse the target URL to extract host, port, and AE Title
                 # Expected format: host:port/AET
-                print(f"Parsing target URL: {target_url}")
-
-                # First, check if the modality already exists
-                try:
-                    existing_modality = json.loads(
-                        orthanc.RestApiGet(f"/modalities/{target}")
-                    )
-                    print(
-                        f"Modality {target} already exists with configuration: {existing_modality}"
-                    )
-
-                    # Delete the existing modality to ensure a clean configuration
-                    orthanc.RestApiDelete(f"/modalities/{target}")
-                    print(f"Deleted existing modality {target}")
-                except:
-                    # Modality doesn't exist, which is fine
-                    pass
-
-                # Parse the URL parts
                 url_parts = target_url.split("/")
                 if len(url_parts) >= 2:
                     host_port = url_parts[0].split(":")
@@ -203,90 +370,80 @@ def SendToAiDicom(output, uri, **request):
                         url_parts[1] if len(url_parts) > 1 else target
                     )  # Use target name as AE Title if not specified
 
-                    print(f"Extracted host: {host}, port: {port}, AET: {aet}")
-
-                    # Configure the DICOM modality with more detailed settings
-                    modality_config = {
-                        "AET": aet,
-                        "Host": host,
-                        "Port": port,
-                        "Manufacturer": "Generic",
-                        "AllowEcho": True,
-                        "AllowFind": True,
-                        "AllowGet": True,
-                        "AllowMove": True,
-                        "AllowStore": True,
-                        "CheckCalledAet": False,
-                        "DicomAet": "ORTHANC",  # Your Orthanc's AE Title
-                        "DicomCheckCalledAet": False,
-                        "DicomPort": 4242,  # Your Orthanc's DICOM port
-                        "DicomWeb": {
-                            "Enable": False,
-                            "Root": "/dicom-web/",
-                            "Ssl": False,
-                            "Studies": True,
-                            "EnableWado": False,
-                            "WadoRoot": "/wado",
-                            "WadoMetadata": {"Enable": False, "MaxResults": 100},
-                        },
-                        "Timeout": 60,  # Increase timeout to 60 seconds
-                        "ConcurrentOperations": 1,  # Limit to 1 concurrent operation
-                        "RetryCount": 3,  # Retry up to 3 times
-                        "RetryDelay": 5,  # Wait 5 seconds between retries
-                        "TransferSyntaxes": [
-                            "1.2.840.10008.1.2.1",  # Explicit VR Little Endian
-                            "1.2.840.10008.1.2",  # Implicit VR Little Endian
-                            "1.2.840.10008.1.2.2",  # Explicit VR Big Endian
-                        ],
-                    }
-
-                    # Add the modality configuration
-                    orthanc.RestApiPut(
-                        f"/modalities/{target}", json.dumps(modality_config)
+                    print(
+                        f"Parsed target URL {target_url}: host: {host}, port: {port}, AET: {aet}"
                     )
-                    print(f"Successfully configured DICOM modality: {target}")
 
-                    # Verify the configuration
+                    # Check if the modality already exists; /modalities/{id} only
+                    # lists the operations it supports, its settings are under
+                    # /configuration
+                    existing_modality = None
                     try:
-                        configured_modality = json.loads(
-                            orthanc.RestApiGet(f"/modalities/{target}")
+                        existing_modality = json_loads(
+                            orthanc.RestApiGet(f"/modalities/{target}/configuration")
                         )
-                        print(f"Verified modality configuration: {configured_modality}")
-                    except Exception as e:
+                        if LOG_PAYLOADS:
+                            print(
+                                f"Modality {target} already exists with configuration: {existing_modality}"
+                            )
+                    except Exception:
+                        # Modality doesn't exist, which is fine
+                        pass
+
+                    if (
+                        isinstance(existing_modality, dict)
+                        and existing_modality.get("AET") == aet
+                        and existing_modality.get("Host") == host
+                        and existing_modality.get("Port") == port
+                    ):
+                        # Same endpoint (e.g. configured before a plugin restart);
+                        # no need to write it again
+                        configured_modalities[target] = target_url
                         print(
-                            f"Warning: Failed to verify modality configuration: {str(e)}"
+                            f"DICOM modality {target} already points at {aet}@{host}:{port}"
+                        )
+                    else:
+                        # PUT creates the modality or replaces its whole
+                        # configuration, so no DELETE is needed beforehand
+                        modality_config = dict(
+                            MODALITY_CONFIG_TEMPLATE, AET=aet, Host=host, Port=port
+                        )
+
+                        # Add the modality configuration
+                        orthanc.RestApiPut(
+                            f"/modalities/{target}", json_dumps(modality_config)
                         )
+                        configured_modalities[target] = target_url
+                        print(f"Successfully configured DICOM modality: {target}")
+
+                        # Read the configuration back for the log only; the PUT is
+                        # synchronous, so this is skipped unless payload logging is on
+                        if LOG_PAYLOADS:
+                            try:
+                                configured_modality = orthanc.RestApiGet(
+                                    f"/modalities/{target}/configuration"
+                                ).decode()
+                                print(
+                                    f"Verified modality configuration: {configured_modality}"
+                                )
+                            except Exception as e:
+                                print(
+                                    f"Warning: Failed to verify modality configuration: {str(e)}"
+                                )
                 else:
                     print(f"Invalid target URL format: {target_url}")
             except Exception as e:
                 print(f"Warning: Failed to configure DICOM modality: {str(e)}")
                 # Continue anyway as the modality might already be configured
 
-        # Get series to send (either by series_uids or filter AI results)
+        # Get series to send (by series_uids; otherwise already filtered above)
         if series_uids:
             # Convert DICOM SeriesInstanceUIDs to Orthanc series IDs
             print(f"Filtering by {len(series_uids)} specific series UIDs")
-            original_series = []
-            for series_uid in series_uids:
-                try:
-                    lookup_result = json.loads(
-                        orthanc.RestApiPost("/tools/lookup", series_uid)
-                    )
-                    series_result = [r for r in lookup_result if r["Type"] == "Series"]
-                    if series_result:
-                        original_series.append(series_result[0]["ID"])
-                        print(
-                            f"Found series {series_result[0]['ID']} for UID {series_uid}"
-                        )
-                    else:
-                        print(f"Warning: Series UID {series_uid} not found")
-                except Exception as e:
-                    print(
-                        f"Warning: Could not lookup series UID {series_uid}: {str(e)}"
-                    )
-        else:
-            # Use existing filter (exclude AI results)
-            original_series = FilterAIResultSeries(study_id)
+            original_series = [
+                series_id
+                for _, series_id in LookupSeriesIds(series_uids, study_id, study_series)
+            ]
 
         if not original_series:
             output.SendHttpStatus(
@@ -296,19 +453,7 @@ def SendToAiDicom(output, uri, **request):
             return
 
         # Collect all instances from filtered series
-        instance_ids = []
-        for series_id in original_series:
-            try:
-                series_instances = json.loads(
-                    orthanc.RestApiGet(f"/series/{series_id}/instances")
-                )
-                series_instance_ids = [instance["ID"] for instance in series_instances]
-                instance_ids.extend(series_instance_ids)
-                print(f"Series {series_id} has {len(series_instance_ids)} instances")
-            except Exception as e:
-                print(
-                    f"Warning: Could not get instances for series {series_id}: {str(e)}"
-                )
+        instance_ids = CollectSeriesInstances(study_id, original_series, study_series)
 
         print(
             f"Collected {len(instance_ids)} instances from {len(original_series)} series"
@@ -319,7 +464,7 @@ def SendToAiDicom(output, uri, **request):
             print(
                 f"Attempting to send {len(instance_ids)} instances from study {study_id} to DICOM modality {target}"
             )
-            orthanc.RestApiPost(f"/modalities/{target}/store", json.dumps(instance_ids))
+            orthanc.RestApiPost(f"/modalities/{target}/store", EncodeIdList(instance_ids))
             print(
                 f"Successfully sent {len(instance_ids)} instances from study {study_id} to DICOM modality {target}"
             )
@@ -330,12 +475,15 @@ def SendToAiDicom(output, uri, **request):
                 "study_id": study_id,
                 "target": target,
             }
-            output.AnswerBuffer(json.dumps(response_data), "application/json")
+            output.AnswerBuffer(json_dumps(response_data), "application/json")
         except Exception as e:
+            # The modality may have been deleted or edited through the REST API
+            # since it was cached; make the next request configure it again
+            configured_modalities.pop(target, None)
             error_message = f"Failed to send study using DICOM protocol: {str(e)}"
             print(error_message)
             error_response = {"status": "error", "message": error_message}
-            output.AnswerBuffer(json.dumps(error_response), "application/json")
+            output.AnswerBuffer(json_dumps(error_response), "application/json")
 
     except Exception as e:
         error_message = str(e)
@@ -343,7 +491,7 @@ def SendToAiDicom(output, uri, **request):
             "status": "error",
             "message": f"Error sending study: {error_message}",
         }
-        output.AnswerBuffer(json.dumps(error_response), "application/json")
+        output.AnswerBuffer(json_dumps(error_response), "application/json")
 
 
 def SendToAiDicomWeb(output, uri, **request):
@@ -356,7 +504,7 @@ def SendToAiDicomWeb(output, uri, **request):
         print("SendToAiDicomWeb: Starting processing of request")
 
         # Parse the POST body
-        body = json.loads(request["body"])
+        body = json_loads(request["body"])
         study_id = body.get("study_id")
         target = body.get("target")
         target_url = body.get("target_url")
@@ -380,7 +528,7 @@ def SendToAiDicomWeb(output, uri, **request):
 
         # Verify study_id exists in Orthanc
         try:
-            study_info = json.loads(orthanc.RestApiGet(f"/studies/{study_id}"))
+            study_info = json_loads(orthanc.RestApiGet(f"/studies/{study_id}"))
             print(f"SendToAiDicomWeb: Valid study found with ID {study_id}")
             print(
                 f"SendToAiDicomWeb: Study contains {len(study_info['Series'])} series and {study_info['PatientMainDicomTags'].get('PatientName', 'Unknown')} patient"
@@ -390,78 +538,87 @@ def SendToAiDicomWeb(output, uri, **request):
             output.SendHttpStatus(404, f"Study with ID {study_id} not found: {str(e)}")
             return
 
-        # If series_uids not provided, check if study has processable content
-        if not series_uids and not HasProcessableContent(study_id):
-            print(
-                "SendToAiDicomWeb: Study contains no processable content (only AI results or empty)"
-            )
-            output.SendHttpStatus(
-                400, "Study contains no processable content (only AI results or empty)"
+        # If series_uids not provided, filter out AI results once up front; an
+        # empty result means the study has no processable content. The records
+        # carry the SeriesInstanceUIDs so no per-series lookup is needed later.
+        if not series_uids:
+            series_records = FilterAIResultSeriesRecords(
+                study_id, study_info.get("LastUpdate")
             )
-            return
+            if not series_records:
+                print(
+                    "SendToAiDicomWeb: Study contains no processable content (only AI results or empty)"
+                )
+                output.SendHttpStatus(
+                    400,
+                    "Study contains no processable content (only AI results or empty)",
+                )
+                return
 
         try:
-            # Configure the DICOMweb server
-            print(
-                f"SendToAiDicomWeb: Configuring DICOMweb server {target} with URL {target_url}"
+            # Configure the DICOMweb server, unless this process already
+            # configured the same target with the same URL and credentials
+            server_key = (
+                target_url,
+                body.get("username", ""),
+                body.get("password", ""),
             )
+            # The cached entry is only trusted while the plugin still lists the
+            # server; it may have been deleted through the REST API since
+            cached = configured_dicomweb_servers.get(target) == server_key
+            if cached and IsDicomWebServerListed(target):
+                print(
+                    f"SendToAiDicomWeb: DICOMweb server {target} already configured for {target_url}"
+                )
+            else:
+                print(
+                    f"SendToAiDicomWeb: Configuring DICOMweb server {target} with URL {target_url}"
+                )
 
-            # Create server configuration
-            server_config = {
-                "Url": target_url,
-                "Username": body.get("username", ""),
-                "Password": body.get("password", ""),
-                "HttpHeaders": {},
-            }
+                # Create server configuration
+                server_config = {
+                    "Url": target_url,
+                    "Username": server_key[1],
+                    "Password": server_key[2],
+                    "HttpHeaders": {},
+                }
 
-            # Configure the server using direct HTTP request
-            config_response = requests.put(
-                f"http://localhost:8042/dicom-web/servers/{target}", json=server_config
-            )
+                # Configure the server through the plugin API rather than an HTTP
+                # request back to this Orthanc's own port. /dicom-web/servers is
+                # served by the DICOMweb plugin, so the call must go through the
+                # "AfterPlugins" variant; plain RestApiPut only sees the core API.
+                try:
+                    orthanc.RestApiPutAfterPlugins(
+                        f"/dicom-web/servers/{target}", json_dumps(server_config)
+                    )
+                except Exception as e:
+                    error_message = f"Error configuring DICOMweb server: {str(e)}"
+                    print(f"SendToAiDicomWeb: {error_message}")
+                    output.SendHttpStatus(500, error_message)
+                    return
 
-            if config_response.status_code not in [200, 201, 204]:
-                error_message = (
-                    f"Error configuring DICOMweb server: {config_response.text}"
+                configured_dicomweb_servers[target] = server_key
+                print(
+                    f"SendToAiDicomWeb: Successfully configured DICOMweb server: {target}"
                 )
-                print(f"SendToAiDicomWeb: {error_message}")
-                output.SendHttpStatus(500, error_message)
-                return
 
-            print(
-                f"SendToAiDicomWeb: Successfully configured DICOMweb server: {target}"
-            )
-
-            # Get series to send (either by series_uids or filter AI results)
+            # Get series to send (by series_uids or the filtered records)
             if series_uids:
                 # Convert DICOM SeriesInstanceUIDs to Orthanc series IDs
                 print(
                     f"SendToAiDicomWeb: Filtering by {len(series_uids)} specific series UIDs"
                 )
-                original_series = []
-                for series_uid in series_uids:
-                    try:
-                        lookup_result = json.loads(
-                            orthanc.RestApiPost("/tools/lookup", series_uid)
-                        )
-                        series_result = [
-                            r for r in lookup_result if r["Type"] == "Series"
-                        ]
-                        if series_result:
-                            original_series.append(series_result[0]["ID"])
-                            print(
-                                f"SendToAiDicomWeb: Found series {series_result[0]['ID']} for UID {series_uid}"
-                            )
-                        else:
-                            print(
-                                f"SendToAiDicomWeb: Warning - Series UID {series_uid} not found"
-                            )
-                    except Exception as e:
-                        print(
-                            f"SendToAiDicomWeb: Warning - Could not lookup series UID {series_uid}: {str(e)}"
-                        )
+                found_series = LookupSeriesIds(series_uids, study_id)
+                original_series = [series_id for _, series_id in found_series]
+                dicom_series_uids = [series_uid for series_uid, _ in found_series]
             else:
-                # Use existing filter (exclude AI results)
-                original_series = FilterAIResultSeries(study_id)
+                # Use the filter result computed above (AI results excluded)
+                original_series = [record["id"] for record in series_records]
+                dicom_series_uids = [
+                    record["series_uid"]
+                    for record in series_records
+                    if record["series_uid"]
+                ]
 
             if not original_series:
                 error_message = "No series found to send"
@@ -469,51 +626,23 @@ def SendToAiDicomWeb(output, uri, **request):
                 output.SendHttpStatus(400, error_message)
                 return
 
-            # Collect all instances from filtered series
-            instance_ids = []
-            for series_id in original_series:
-                try:
-                    series_instances = json.loads(
-                        orthanc.RestApiGet(f"/series/{series_id}/instances")
-                    )
-                    series_instance_ids = [
-                        instance["ID"] for instance in series_instances
-                    ]
-                    instance_ids.extend(series_instance_ids)
-                    print(
-                        f"SendToAiDicomWeb: Series {series_id} has {len(series_instance_ids)} instances"
-                    )
-                except Exception as e:
-                    print(
-                        f"SendToAiDicomWeb: Warning - Could not get instances for series {series_id}: {str(e)}"
-                    )
-
+            # No instance listing needed here: the router pulls the series itself
+            # via WADO-RS, so only the series UIDs go into the workitem
             print(
-                f"SendToAiDicomWeb: Collected {len(instance_ids)} instances from {len(original_series)} series"
+                f"SendToAiDicomWeb: Selected {len(original_series)} series for the UPS workitem"
             )
 
             # NEW: Create UPS workitem on router before sending data
             # Extract router URL from target_url (remove /dicom-web suffix if present)
             router_base_url = target_url.replace("/dicom-web", "").rstrip("/")
 
-            # Get study UID
-            study_uid = GetStudyInstanceUID(study_id)
+            # Get study UID from the study info fetched above
+            study_uid = study_info.get("MainDicomTags", {}).get("StudyInstanceUID")
             if not study_uid:
                 print("SendToAiDicomWeb: Could not get StudyInstanceUID")
                 output.SendHttpStatus(500, "Could not get StudyInstanceUID")
                 return
 
-            # Get series UIDs (DICOM UIDs, not Orthanc IDs)
-            dicom_series_uids = []
-            for series_id in original_series:
-                try:
-                    series_info = json.loads(orthanc.RestApiGet(f"/series/{series_id}"))
-                    series_dicom_uid = series_info.get("MainDicomTags", {}).get("SeriesInstanceUID")
-                    if series_dicom_uid:
-                        dicom_series_uids.append(series_dicom_uid)
-                except Exception as e:
-                    print(f"Warning: Could not get SeriesInstanceUID for {series_id}: {str(e)}")
-
             # Create UPS workitem on router
             try:
                 ups_workitem_request = {
@@ -530,18 +659,20 @@ def SendToAiDicomWeb(output, uri, **request):
 
                 post_url = f"{router_base_url}/ups-rs/workitems"
                 print(f"SendToAiDicomWeb: Creating UPS workitem on router at {post_url}")
-                print(f"SendToAiDicomWeb: Request body: {json.dumps(ups_workitem_request)}")
+                ups_workitem_body = json_dumps(ups_workitem_request)
+                if LOG_PAYLOADS:
+                    print(f"SendToAiDicomWeb: Request body: {ups_workitem_request}")
 
-                ups_response = requests.post(
+                ups_response = http_session.post(
                     post_url,
-                    json=ups_workitem_request,
-                    headers={"Content-Type": "application/json"},
-                    timeout=10
+                    data=ups_workitem_body,
+                    timeout=(HTTP_CONNECT_TIMEOUT, 10),
+                    allow_redirects=False,
                 )
 
                 print(f"SendToAiDicomWeb: POST response status: {ups_response.status_code}")
                 if ups_response.status_code in [200, 201]:
-                    ups_workitem_data = ups_response.json()
+                    ups_workitem_data = json_loads(ups_response.content)
                     workitem_uid = ups_workitem_data.get("00080018", {}).get("Value", [None])[0]
                     print(f"SendToAiDicomWeb: Created UPS workitem on router: {workitem_uid}")
 
@@ -552,10 +683,11 @@ def SendToAiDicomWeb(output, uri, **request):
                             "subscriber_url": "http://orthanc-viewer:8042",
                             "deletion_lock": False
                         }
-                        subscribe_response = requests.post(
+                        subscribe_response = http_session.post(
                             subscribe_url,
-                            json=subscribe_body,
-                            timeout=5
+                            data=json_dumps(subscribe_body),
+                            timeout=(HTTP_CONNECT_TIMEOUT, 5),
+                            allow_redirects=False,
                         )
                         if subscribe_response.status_code == 200:
                             print(f"SendToAiDicomWeb: Successfully subscribed to workitem {workitem_uid}")
@@ -580,7 +712,7 @@ def SendToAiDicomWeb(output, uri, **request):
                     "status": "error",
                     "message": error_message
                 }
-                output.AnswerBuffer(json.dumps(error_response), "application/json")
+                output.AnswerBuffer(json_dumps(error_response), "application/json")
                 return
 
             # UPS-RS: No data transfer to router
@@ -597,10 +729,10 @@ def SendToAiDicomWeb(output, uri, **request):
                 "series_count": len(original_series),
             }
             print(f"SendToAiDicomWeb: Returning success response with workitem_uid={workitem_uid}")
-            print(f"SendToAiDicomWeb: Full response: {json.dumps(success_response)}")
-            output.AnswerBuffer(
-                json.dumps(success_response), "application/json"
-            )
+            success_body = json_dumps(success_response)
+            if LOG_PAYLOADS:
+                print(f"SendToAiDicomWeb: Full response: {success_response}")
+            output.AnswerBuffer(success_body, "application/json")
 
         except Exception as e:
             error_message = f"Error during STOW-RS request: {str(e)}"
@@ -631,22 +763,22 @@ def UPSUpdateWorkitem(output, uri, **request):
         return
 
     try:
-        workitem_uid = uri.split('/')[-1]
-        body = json.loads(request["body"])
+        workitem_uid = uri.rpartition('/')[2]
 
         # Store workitem using UPS storage
         if ups_storage:
-            # Use from_json method with JSON string
+            # Use from_json method with JSON string (the only parse of the body)
             workitem = UPSWorkitem.from_json(request["body"], workitem_uid)
             ups_storage.store_workitem(workitem)
             state = workitem.get_state()
         else:
             # Fallback: just log if storage not available
+            body = json_loads(request["body"])
             state = body.get('00741000', {}).get('Value', ['UNKNOWN'])[0]
 
         print(f"Received workitem update: {workitem_uid}, state: {state}")
 
-        output.AnswerBuffer(json.dumps({"status": "updated"}), "application/json")
+        output.AnswerBuffer(json_dumps({"status": "updated"}), "application/json")
     except Exception as e:
         print(f"Error updating workitem: {str(e)}")
         output.SendHttpStatus(500, str(e))
@@ -662,16 +794,17 @@ def UPSGetWorkitem(output, uri, **request):
         return
 
     try:
-        workitem_uid = uri.split('/')[-1]
+        workitem_uid = uri.rpartition('/')[2]
         print(f"UPSGetWorkitem: Retrieving workitem {workitem_uid} from local storage")
 
         if not ups_storage:
             output.SendHttpStatus(500, "UPS storage not initialized")
             return
 
-        workitem = ups_storage.get_workitem(workitem_uid)
-        if workitem:
-            output.AnswerBuffer(workitem.to_json(), "application/dicom+json")
+        # Serve the stored JSON as-is instead of parsing and re-serializing it
+        workitem_json = ups_storage.get_workitem_json(workitem_uid)
+        if workitem_json:
+            output.AnswerBuffer(workitem_json, "application/dicom+json")
         else:
             print(f"UPSGetWorkitem: Workitem {workitem_uid} not found")
             output.SendHttpStatus(404, f"Workitem {workitem_uid} not found")
@@ -720,19 +853,20 @@ def GetAIManifest(output, uri, **request):
         manifest_url = f"{router_base_url}/manifest"
         print(f"GetAIManifest: Fetching manifest from {manifest_url}")
 
-        resp = requests.get(manifest_url, timeout=5)
+        resp = http_session.get(manifest_url, timeout=(HTTP_CONNECT_TIMEOUT, 5))
         if resp.status_code == 200:
-            output.AnswerBuffer(resp.text, "application/json")
+            # Relay the router's bytes as-is; no need to decode them to str first
+            output.AnswerBuffer(resp.content, "application/json")
         else:
             print(f"GetAIManifest: Router returned {resp.status_code}, returning null manifest")
-            output.AnswerBuffer(json.dumps({"manifest": None}), "application/json")
+            output.AnswerBuffer(NULL_MANIFEST_JSON, "application/json")
 
     except requests.exceptions.RequestException as e:
         print(f"GetAIManifest: Connection error to router: {e}")
-        output.AnswerBuffer(json.dumps({"manifest": None}), "application/json")
+        output.AnswerBuffer(NULL_MANIFEST_JSON, "application/json")
     except Exception as e:
         print(f"GetAIManifest: Unexpected error: {e}")
-        output.AnswerBuffer(json.dumps({"manifest": None}), "application/json")
+        output.AnswerBuffer(NULL_MANIFEST_JSON, "application/json")
 
 
 # Register the REST endpoints
@@ -57,6 +57,27 @@ class UPSStorage:
             print(f"Error retrieving workitem {workitem_uid}: {str(e)}")
             return None
 
+    def get_workitem_json(self, workitem_uid):
+        """
+        Retrieve the stored DICOM JSON of a workitem without deserializing it
+
+        Args:
+            workitem_uid: The workitem UID
+
+        Returns:
+            JSON bytes as written by store_workitem, or None if not found
+        """
+        key = f"{self.KEY_PREFIX}{workitem_uid}"
+
+        try:
+            value = orthanc.GetKeyValue(self.BUCKET, key)
+            if value is None:
+                print(f"Workitem {workitem_uid} not found in storage")
+            return value
+        except Exception as e:
+            print(f"Error retrieving workitem {workitem_uid}: {str(e)}")
+            return None
+
     def delete_workitem(self, workitem_uid):
         """
         Delete workitem from K-V store
@@ -3,10 +3,11 @@ UPS Workitem management with DICOM JSON format
 Based on DICOM PS3.4 Section CC and PS3.18 Section 11
 """
 
-import json
 from datetime import datetime
 from pydicom.uid import generate_uid
 
+from json_compat import json_dumps, json_loads  # type: ignore
+
 
 class UPSWorkitem:
     """
@@ -119,7 +120,7 @@ class UPSWorkitem:
 
     def to_json(self):
         """Serialize to JSON string for K-V storage"""
-        return json.dumps(self.data)
+        return json_dumps(self.data).decode("utf-8")
 
     @classmethod
     def from_json(cls, json_str, workitem_uid):
@@ -135,7 +136,7 @@ class UPSWorkitem:
         """
         instance = cls.__new__(cls)
         instance.workitem_uid = workitem_uid
-        instance.data = json.loads(json_str)
+        instance.data = json_loads(json_str)
         return instance
 
     def get_state(self):
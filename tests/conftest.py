@@ -1,9 +1,11 @@
+import itertools
 import os
 import time
 from typing import Dict
 
 import pytest
 import requests
+from requests.adapters import HTTPAdapter
 
 
 @pytest.fixture(scope="session")
@@ -11,31 +13,50 @@ def base_url() -> str:
     return os.environ.get("ORTHANC_VIEWER_BASE_URL", "http://localhost:8000")
 
 
+@pytest.fixture(scope="session")
+def http() -> requests.Session:
+    # One keep-alive session for the whole run instead of a connection per call
+    session = requests.Session()
+    session.mount(
+        "http://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+    )
+    yield session
+    session.close()
+
+
 @pytest.fixture(scope="session", autouse=True)
-def wait_for_orthanc(base_url: str):
-    # Wait up to 30s for health endpoint
+def wait_for_orthanc(base_url: str, http: requests.Session):
+    # Wait up to 30s for health endpoint, backing off from 50ms so an already
+    # running server is picked up almost immediately
     deadline = time.time() + 30
+    delay = 0.05
     last_error = None
     while time.time() < deadline:
         try:
-            r = requests.get(f"{base_url}/feedback/health", timeout=2)
+            r = http.get(f"{base_url}/feedback/health", timeout=2)
             if r.status_code == 200:
                 return
             last_error = f"HTTP {r.status_code}"
         except Exception as e:
             last_error = str(e)
-        time.sleep(1)
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
     pytest.skip(f"orthanc-viewer not ready at {base_url}: {last_error}")
 
 
+_payload_seq = itertools.count()
+
+
 @pytest.fixture()
 def unique_payload() -> Dict[str, str]:
-    # Use time-based unique values
+    # Time-based values, plus the process ID and a per-process counter so tests
+    # running in parallel (pytest -n auto) never share a study or user
     ts = int(time.time() * 1000)
+    suffix = f"{os.getpid()}.{next(_payload_seq)}"
     return {
-        "study_uid": f"1.2.826.0.1.3680043.2.1125.{ts}",
+        "study_uid": f"1.2.826.0.1.3680043.2.1125.{ts}.{suffix}",
         "model_name": "TumorSeg",
         "model_version": "1.4.0",
         "result_ts": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
-        "user_id": f"user-{ts}",
+        "user_id": f"user-{ts}.{suffix}",
     }
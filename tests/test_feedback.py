@@ -1,21 +1,65 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
+# Encode request bodies and decode response bytes with orjson when installed,
+# as the plugins do
+try:
+    import orjson
 
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
 
-def test_health(base_url):
-    r = requests.get(f"{base_url}/feedback/health")
+
+def _post_json(http, url, obj):
+    # Serialize once ourselves rather than through requests' json= (stdlib json)
+    return http.post(
+        url, data=_dumps(obj), headers={"Content-Type": "application/json"}
+    )
+
+
+def _matching_rows(response, payload):
+    # Parse the NDJSON export one line at a time, keeping only this test's rows.
+    # The study/user IDs need no JSON escaping, so a byte substring check skips
+    # other tests' rows without decoding them.
+    study_needle = payload["study_uid"].encode()
+    user_needle = payload["user_id"].encode()
+    rows = []
+    for raw in response.iter_lines():
+        if study_needle not in raw or user_needle not in raw:
+            continue
+        p = _loads(raw)
+        if (
+            p["study_uid"] == payload["study_uid"]
+            and p["result_ts"] == payload["result_ts"]
+            and p["user_id"] == payload["user_id"]
+        ):
+            rows.append(p)
+    return rows
+
+
+def _csv_header(response) -> str:
+    # Only the header line is asserted on, so stop reading after it; leaving the
+    # with-block closes the response without buffering the rest of the export
+    return next(response.iter_lines(), b"").decode()
+
+
+def test_health(base_url, http):
+    r = http.get(f"{base_url}/feedback/health")
     assert r.status_code == 200
-    j = r.json()
+    j = _loads(r.content)
     assert "db_ready" in j and j["db_ready"] is True
     assert "sqlite_version" in j
 
 
-def test_register_and_submit_flow(base_url, unique_payload):
+def test_register_and_submit_flow(base_url, http, unique_payload):
     # 1) register-result idempotent
-    reg1 = requests.post(
+    reg1 = _post_json(
+        http,
         f"{base_url}/feedback/register-result",
-        json={
+        {
             "study_uid": unique_payload["study_uid"],
             "model_name": unique_payload["model_name"],
             "model_version": unique_payload["model_version"],
@@ -24,35 +68,39 @@ def test_register_and_submit_flow(base_url, unique_payload):
     )
     assert reg1.status_code in (200, 201)
 
-    reg2 = requests.post(
+    reg2 = _post_json(
+        http,
         f"{base_url}/feedback/register-result",
-        json={
+        {
             "study_uid": unique_payload["study_uid"],
             "model_name": unique_payload["model_name"],
             "model_version": unique_payload["model_version"],
             "result_ts": unique_payload["result_ts"],
         },
     )
-    assert reg2.status_code in (200, 201)
+    assert reg2.status_code == 200
+    assert _loads(reg2.content)["created"] is False
 
     # 2) submit
-    sub = requests.post(
+    sub = _post_json(
+        http,
         f"{base_url}/feedback/submit",
-        json={
+        {
             **unique_payload,
             "verdict_L": 1,
             "verdict_R": -1,
         },
     )
     assert sub.status_code == 201
-    j = json.loads(sub.text)
+    j = _loads(sub.content)
     assert j["study_uid"] == unique_payload["study_uid"]
     assert j["verdict_L"] == 1 and j["verdict_R"] == -1
 
     # 3) duplicate submit
-    dup = requests.post(
+    dup = _post_json(
+        http,
         f"{base_url}/feedback/submit",
-        json={
+        {
             **unique_payload,
             "verdict_L": 1,
             "verdict_R": -1,
@@ -60,63 +108,70 @@ def test_register_and_submit_flow(base_url, unique_payload):
     )
     assert dup.status_code == 409
 
-    # 4) aggregates
-    agg = requests.get(
-        f"{base_url}/feedback",
-        params={
-            "study_uid": unique_payload["study_uid"],
-            "model_name": unique_payload["model_name"],
-            "model_version": unique_payload["model_version"],
-            "result_ts": unique_payload["result_ts"],
-            "includeUsers": "true",
-        },
-    )
+    # 4) aggregates and 5) exports only read what step 2 committed, so the three
+    # GETs run concurrently over the session's connection pool
+    export_params = {
+        "model_name": unique_payload["model_name"],
+        "model_version": unique_payload["model_version"],
+    }
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        f_agg = ex.submit(
+            http.get,
+            f"{base_url}/feedback",
+            params={
+                "study_uid": unique_payload["study_uid"],
+                "model_name": unique_payload["model_name"],
+                "model_version": unique_payload["model_version"],
+                "result_ts": unique_payload["result_ts"],
+                "includeUsers": "true",
+            },
+        )
+        f_nd = ex.submit(
+            http.get, f"{base_url}/feedback/export.ndjson", params=export_params
+        )
+        f_csv = ex.submit(
+            http.get,
+            f"{base_url}/feedback/export.csv",
+            params=export_params,
+            stream=True,
+        )
+
+    agg = f_agg.result()
     assert agg.status_code == 200
-    aj = agg.json()
+    aj = _loads(agg.content)
     assert aj["n_submissions"] >= 1
     assert aj["aggregate"]["L"]["agree"] >= 1
     assert isinstance(aj.get("users", []), list)
 
-    # 5) exports
-    nd = requests.get(
-        f"{base_url}/feedback/export.ndjson",
-        params={
-            "model_name": unique_payload["model_name"],
-            "model_version": unique_payload["model_version"],
-        },
-    )
+    nd = f_nd.result()
     assert nd.status_code == 200
     assert len(nd.text.strip()) > 0
 
-    csv = requests.get(
-        f"{base_url}/feedback/export.csv",
-        params={
-            "model_name": unique_payload["model_name"],
-            "model_version": unique_payload["model_version"],
-        },
-    )
-    assert csv.status_code == 200
-    assert csv.text.splitlines()[0].startswith("study_uid,model_name,model_version")
+    with f_csv.result() as csv:
+        assert csv.status_code == 200
+        assert _csv_header(csv).startswith("study_uid,model_name,model_version")
 
 
-def test_edit_flow_and_exports(base_url, unique_payload):
+def test_edit_flow_and_exports(base_url, http, unique_payload):
     # Initial submit
-    sub1 = requests.post(
+    sub1 = _post_json(
+        http,
         f"{base_url}/feedback/submit",
-        json={
+        {
             **unique_payload,
             "verdict_L": 1,
             "verdict_R": 0,
         },
     )
     assert sub1.status_code == 201
-    j1 = json.loads(sub1.text)
+    j1 = _loads(sub1.content)
     assert j1["submission_kind"] == "initial"
 
     # Duplicate without edited flag should 409
-    dup = requests.post(
+    dup = _post_json(
+        http,
         f"{base_url}/feedback/submit",
-        json={
+        {
             **unique_payload,
             "verdict_L": 1,
             "verdict_R": 0,
@@ -125,9 +180,10 @@ def test_edit_flow_and_exports(base_url, unique_payload):
     assert dup.status_code == 409
 
     # Edit with edited=true
-    sub2 = requests.post(
+    sub2 = _post_json(
+        http,
         f"{base_url}/feedback/submit",
-        json={
+        {
             **unique_payload,
             "verdict_L": -1,
             "verdict_R": 1,
@@ -135,11 +191,11 @@ def test_edit_flow_and_exports(base_url, unique_payload):
         },
     )
     assert sub2.status_code == 201
-    j2 = json.loads(sub2.text)
+    j2 = _loads(sub2.content)
     assert j2["submission_kind"] == "edit"
 
     # Read current aggregates and users
-    agg = requests.get(
+    agg = http.get(
         f"{base_url}/feedback",
         params={
             "study_uid": unique_payload["study_uid"],
@@ -151,7 +207,7 @@ def test_edit_flow_and_exports(base_url, unique_payload):
         },
     )
     assert agg.status_code == 200
-    aj = agg.json()
+    aj = _loads(agg.content)
     # Current should reflect the latest edit values
     assert aj["aggregate"]["L"]["disagree"] >= 1
     assert aj["aggregate"]["R"]["agree"] >= 1
@@ -164,68 +220,94 @@ def test_edit_flow_and_exports(base_url, unique_payload):
     assert set(h["submission_kind"] for h in history) >= {"initial", "edit"}
 
     # NDJSON export history: filter lines for our study/result
-    nd_hist = requests.get(
+    with http.get(
         f"{base_url}/feedback/export.ndjson",
         params={
             "model_name": unique_payload["model_name"],
             "model_version": unique_payload["model_version"],
             "scope": "history",
         },
-    )
-    assert nd_hist.status_code == 200
-    lines = [ln for ln in nd_hist.text.splitlines() if ln.strip()]
-    parsed = [json.loads(ln) for ln in lines]
-    mine = [
-        p
-        for p in parsed
-        if p["study_uid"] == unique_payload["study_uid"]
-        and p["result_ts"] == unique_payload["result_ts"]
-        and p["user_id"] == unique_payload["user_id"]
-    ]
+        stream=True,
+    ) as nd_hist:
+        assert nd_hist.status_code == 200
+        mine = _matching_rows(nd_hist, unique_payload)
     assert len(mine) >= 2
     assert set(p["submission_kind"] for p in mine) >= {"initial", "edit"}
 
     # NDJSON export current: exactly one current row per user/result
-    nd_curr = requests.get(
+    with http.get(
         f"{base_url}/feedback/export.ndjson",
         params={
             "model_name": unique_payload["model_name"],
             "model_version": unique_payload["model_version"],
             "scope": "current",
         },
-    )
-    assert nd_curr.status_code == 200
-    curr_lines = [ln for ln in nd_curr.text.splitlines() if ln.strip()]
-    curr_parsed = [json.loads(ln) for ln in curr_lines]
-    curr_mine = [
-        p
-        for p in curr_parsed
-        if p["study_uid"] == unique_payload["study_uid"]
-        and p["result_ts"] == unique_payload["result_ts"]
-        and p["user_id"] == unique_payload["user_id"]
-    ]
+        stream=True,
+    ) as nd_curr:
+        assert nd_curr.status_code == 200
+        curr_mine = _matching_rows(nd_curr, unique_payload)
     assert len(curr_mine) == 1
     assert curr_mine[0]["submission_kind"] == "edit"
 
     # CSV export current/history headers include submission_kind
-    csv_hist = requests.get(
+    with http.get(
         f"{base_url}/feedback/export.csv",
         params={
             "model_name": unique_payload["model_name"],
             "model_version": unique_payload["model_version"],
             "scope": "history",
         },
-    )
-    assert csv_hist.status_code == 200
-    assert csv_hist.text.splitlines()[0].endswith(",submission_kind")
+        stream=True,
+    ) as csv_hist:
+        assert csv_hist.status_code == 200
+        assert _csv_header(csv_hist).endswith(",submission_kind")
 
-    csv_curr = requests.get(
+    with http.get(
         f"{base_url}/feedback/export.csv",
         params={
             "model_name": unique_payload["model_name"],
             "model_version": unique_payload["model_version"],
             "scope": "current",
         },
+        stream=True,
+    ) as csv_curr:
+        assert csv_curr.status_code == 200
+        assert _csv_header(csv_curr).endswith(",submission_kind")
+
+
+def test_batch_flow(base_url, http, unique_payload):
+    result_key = {
+        k: unique_payload[k]
+        for k in ("study_uid", "model_name", "model_version", "result_ts")
+    }
+    # register (twice, idempotent) + submit + duplicate + edit + read in a
+    # single round trip
+    r = _post_json(
+        http,
+        f"{base_url}/feedback/batch",
+        {
+            "ops": [
+                {"op": "register_result", **result_key},
+                {"op": "register_result", **result_key},
+                {"op": "submit", **unique_payload, "verdict_L": 1, "verdict_R": 0},
+                {"op": "submit", **unique_payload, "verdict_L": 1, "verdict_R": 0},
+                {
+                    "op": "submit",
+                    **unique_payload,
+                    "verdict_L": -1,
+                    "verdict_R": 1,
+                    "edited": True,
+                },
+                {"op": "read", **result_key, "includeUsers": "true"},
+            ]
+        },
     )
-    assert csv_curr.status_code == 200
-    assert csv_curr.text.splitlines()[0].endswith(",submission_kind")
+    assert r.status_code == 200
+    results = _loads(r.content)["results"]
+    assert [res["status"] for res in results] == [201, 200, 201, 409, 201, 200]
+    assert results[1]["body"] == {"created": False, "id": results[0]["body"]["id"]}
+    assert results[2]["body"]["submission_kind"] == "initial"
+    assert results[4]["body"]["submission_kind"] == "edit"
+    aj = results[5]["body"]
+    assert aj["aggregate"]["L"]["disagree"] >= 1
+    assert aj["aggregate"]["R"]["agree"] >= 1
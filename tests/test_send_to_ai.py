@@ -0,0 +1,78 @@
+import os
+import time
+
+import pytest
+
+SAMPLE_DICOM = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample_data",
+    "sc.dcm",
+)
+
+
+@pytest.fixture()
+def sample_series(base_url, http):
+    # Upload a sample instance; only remove the study afterwards if this test
+    # stored it, so existing data on the viewer is left alone
+    with open(SAMPLE_DICOM, "rb") as f:
+        up = http.post(
+            f"{base_url}/instances",
+            data=f.read(),
+            headers={"Content-Type": "application/dicom"},
+        )
+    assert up.status_code == 200
+    uploaded = up.json()
+    series = http.get(f"{base_url}/series/{uploaded['ParentSeries']}").json()
+    yield uploaded["ParentStudy"], series["MainDicomTags"]["SeriesInstanceUID"]
+    if uploaded.get("Status") == "Success":
+        http.delete(f"{base_url}/studies/{uploaded['ParentStudy']}")
+
+
+def test_dicomweb_send_configures_new_server(base_url, http, sample_series):
+    study_id, series_uid = sample_series
+    target = f"test-dicomweb-{os.getpid()}-{int(time.time() * 1000)}"
+    request = {
+        "study_id": study_id,
+        "target": target,
+        "target_url": "http://127.0.0.1:9/dicom-web",
+        "series_uids": [series_uid],
+    }
+    try:
+        # Nothing listens on the discard port, so the UPS workitem POST to the
+        # "router" fails; the DICOMweb server must have been configured before it.
+        # The second send follows a REST delete of the server and must not trust
+        # the plugin's cached configuration.
+        for _ in range(2):
+            r = http.post(f"{base_url}/send-to-ai-dicomweb", json=request)
+            assert r.status_code == 200
+            servers = http.get(f"{base_url}/dicom-web/servers")
+            assert servers.status_code == 200
+            assert target in servers.json()
+            http.delete(f"{base_url}/dicom-web/servers/{target}")
+    finally:
+        http.delete(f"{base_url}/dicom-web/servers/{target}")
+
+
+def test_dicom_send_reconfigures_changed_target_url(base_url, http, sample_series):
+    study_id, series_uid = sample_series
+    target = f"test-dicom-{os.getpid()}-{int(time.time() * 1000)}"
+    # Nothing listens on these ports, so the C-STOREs fail; each send must still
+    # have (re)configured the modality before attempting them
+    try:
+        for target_url in ("127.0.0.1:9/AIFIRST", "127.0.0.1:7/AISECOND"):
+            r = http.post(
+                f"{base_url}/send-to-ai-dicom",
+                json={
+                    "study_id": study_id,
+                    "target": target,
+                    "target_url": target_url,
+                    "series_uids": [series_uid],
+                },
+            )
+            assert r.status_code == 200
+        config = http.get(f"{base_url}/modalities/{target}/configuration")
+        assert config.status_code == 200
+        c = config.json()
+        assert (c["AET"], c["Host"], c["Port"]) == ("AISECOND", "127.0.0.1", 7)
+    finally:
+        http.delete(f"{base_url}/modalities/{target}")